@@ -1,26 +1,34 @@
 import gradio as gr
-from config import RATE_LIMIT_MAX_REQUESTS, RATE_LIMIT_WINDOW, ROLES, init_openai_client
+from config import RATE_LIMIT_MAX_REQUESTS, RATE_LIMIT_WINDOW, init_openai_client
 from userAuth import UserAuth
 from RateLimiter import RateLimiter
 
 from vectorDocumentStore import VectorDocumentStore
 from utils import add_sample_documents
 from RagChat import RAGChat
+from queryLog import QueryLogger
+from roleRegistry import RoleRegistry
 
 client = init_openai_client()
 print("initialized openai_client")
 
-user_auth = UserAuth()
+role_registry = RoleRegistry()
+print("initialized Role Registry")
+
+user_auth = UserAuth(role_registry=role_registry)
 print("initialized User Auth")
 
-doc_store = VectorDocumentStore(client)
+doc_store = VectorDocumentStore(client, role_registry=role_registry)
 print("initialized Vector data store")
 
-rag_chat = RAGChat(client, doc_store)
+query_logger = QueryLogger()
+rag_chat = RAGChat(client, doc_store, query_logger=query_logger)
 print("initialized Rag Chat")
 
 rate_limiter = RateLimiter()
-if not any(doc_store.list_documents(role) for role in ROLES):
+# Only the roles that ship sample documents are checked, so startup does not open every collection
+sample_roles = [role for role in ["finance", "engineering"] if role in role_registry]
+if sample_roles and not any(doc_store.list_documents(role) for role in sample_roles):
     add_sample_documents(doc_store)
 
 with gr.Blocks(title="Role-Based RAG System") as demo:
@@ -138,7 +146,7 @@ with gr.Blocks(title="Role-Based RAG System") as demo:
         with gr.Accordion("User Management", open=False):
             new_user = gr.Textbox(label="New Username")
             new_pass = gr.Textbox(label="New Password", type="password")
-            new_role = gr.Dropdown(label="Role", choices=ROLES)
+            new_role = gr.Dropdown(label="Role", choices=role_registry.list_roles())
             add_user_btn = gr.Button("Add User")
             user_result = gr.Markdown("")
             
@@ -164,6 +172,41 @@ with gr.Blocks(title="Role-Based RAG System") as demo:
                 outputs=[user_result]
             )
             
+            users_csv = gr.File(label="Bulk import users (CSV with username,password,role columns)", type="filepath")
+            import_users_btn = gr.Button("Import Users")
+            import_result = gr.Markdown("")
+            
+            def import_users(token, current_role, csv_path):
+                if not token:
+                    return "Please login first."
+                
+                session_result = user_auth.validate_session(token)
+                if not session_result:
+                    return "Session expired. Please login again."
+                
+                if current_role != "admin":
+                    return "You need admin privileges."
+                if not csv_path:
+                    return "Please choose a CSV file to import."
+                
+                try:
+                    report = user_auth.add_users_from_csv(csv_path)
+                except Exception as e:
+                    return f"Failed to import users: {str(e)}"
+                
+                added = sum(1 for entry in report if entry["success"])
+                result = f"## Import Report\nAdded {added} of {len(report)} users\n\n| Username | Role | Result |\n|---|---|---|\n"
+                for entry in report:
+                    outcome = "Added" if entry["success"] else entry["error"]
+                    result += f"| {entry['username']} | {entry['role']} | {outcome} |\n"
+                return result
+            
+            import_users_btn.click(
+                fn=import_users,
+                inputs=[session_token, current_role, users_csv],
+                outputs=[import_result]
+            )
+            
             list_users_btn = gr.Button("List Users")
             user_list =gr.Markdown("")
             
@@ -185,7 +228,7 @@ with gr.Blocks(title="Role-Based RAG System") as demo:
         
         with gr.Accordion("Document Management", open=False):
             doc_title = gr.Textbox(label="Document Title")
-            doc_role = gr.Dropdown(label="Document Role", choices=ROLES)
+            doc_role = gr.Dropdown(label="Document Role", choices=role_registry.list_roles())
             doc_content = gr.Textbox(label="Document Content", lines=10)
             add_doc_btn = gr.Button("Add Document")
             doc_result = gr.Markdown("")
@@ -204,4 +247,115 @@ with gr.Blocks(title="Role-Based RAG System") as demo:
                 inputs=[current_user, current_role, doc_title, doc_role, doc_content],
                 outputs=[doc_result]
             )
+            
+            doc_file = gr.File(label="Or upload a large text file", type="filepath")
+            upload_doc_btn = gr.Button("Ingest File")
+            
+            def ingest_document_file(current_user, current_role, title, role, file_path):
+                if not current_user or current_role != "admin":
+                    return "You need admin privileges."
+                if not file_path:
+                    return "Please choose a file to ingest."
+                
+                success = doc_store.add_document_file(role, title, file_path)
+                if success:
+                    return f"Ingested file as document '{title}' for role {role}"
+                return f"Failed to ingest file"
+            
+            upload_doc_btn.click(
+                fn=ingest_document_file,
+                inputs=[current_user, current_role, doc_title, doc_role, doc_file],
+                outputs=[doc_result]
+            )
+
+        with gr.Accordion("Role Management", open=False):
+            role_name = gr.Textbox(label="Role Name")
+            add_role_btn = gr.Button("Add Role")
+            remove_role_btn = gr.Button("Remove Role")
+            role_result = gr.Markdown("")
+            
+            def role_choices():
+                roles = role_registry.list_roles()
+                return gr.update(choices=roles), gr.update(choices=roles)
+            
+            def add_new_role(current_user, current_role, name):
+                if not current_user or current_role != "admin":
+                    return ("You need admin privileges.",) + role_choices()
+                
+                success = role_registry.add_role(name)
+                if success:
+                    return (f"Added role {role_registry.normalize(name)}",) + role_choices()
+                return (f"Failed to add role {name}. Use lowercase letters, digits, '-' or '_' and a new name.",) + role_choices()
+            
+            def remove_existing_role(current_user, current_role, name):
+                if not current_user or current_role != "admin":
+                    return ("You need admin privileges.",) + role_choices()
+                
+                # Resolve the name the way the registry stores it before touching users and data
+                name = role_registry.normalize(name)
+                members = user_auth.users_with_role(name)
+                if members:
+                    return (f"Role {name} still has {len(members)} users assigned.",) + role_choices()
+                
+                success = role_registry.remove_role(name)
+                if success:
+                    doc_store.delete_role_data(name)
+                    return (f"Removed role {name}",) + role_choices()
+                return (f"Failed to remove role {name}",) + role_choices()
+            
+            add_role_btn.click(
+                fn=add_new_role,
+                inputs=[current_user, current_role, role_name],
+                outputs=[role_result, new_role, doc_role]
+            )
+            remove_role_btn.click(
+                fn=remove_existing_role,
+                inputs=[current_user, current_role, role_name],
+                outputs=[role_result, new_role, doc_role]
+            )
+            session_token.change(fn=role_choices, inputs=None, outputs=[new_role, doc_role])
+
+        with gr.Accordion("Vector Store Snapshot", open=False):
+            snapshot_path = gr.Textbox(label="Snapshot Path", value="vectors.snapshot")
+            export_snapshot_btn = gr.Button("Export Snapshot")
+            snapshot_result = gr.Markdown("")
+            
+            def export_snapshot(current_user, current_role, path):
+                if not current_user or current_role != "admin":
+                    return "You need admin privileges."
+                
+                try:
+                    manifest = doc_store.export_snapshot(path)
+                except Exception as e:
+                    return f"Failed to export snapshot: {str(e)}"
+                total = sum(info["count"] for info in manifest["roles"].values())
+                return f"Exported {total} vectors from {len(manifest['roles'])} roles to {path}"
+            
+            export_snapshot_btn.click(
+                fn=export_snapshot,
+                inputs=[current_user, current_role, snapshot_path],
+                outputs=[snapshot_result]
+            )
+
+        with gr.Accordion("Query Routing", open=False):
+            route_stats_btn = gr.Button("Show Route Latency")
+            route_stats = gr.Markdown("")
+            
+            def show_route_stats(current_user, current_role):
+                if not current_user or current_role != "admin":
+                    return "You need admin privileges."
+                
+                stats = rag_chat.router.get_stats()
+                if not stats:
+                    return "No routed queries yet."
+                result = "## Route Latency\n| Route | Queries | Mean (s) | p50 (s) | p95 (s) | Max (s) |\n|---|---|---|---|---|---|\n"
+                for route, s in stats.items():
+                    result += f"| {route} | {s['count']} | {s['mean']:.2f} | {s['p50']:.2f} | {s['p95']:.2f} | {s['max']:.2f} |\n"
+                return result
+            
+            route_stats_btn.click(
+                fn=show_route_stats,
+                inputs=[current_user, current_role],
+                outputs=[route_stats]
+            )
 demo.launch(share=True)
\ No newline at end of file
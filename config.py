@@ -9,16 +9,48 @@ USER_DB_PATH = DATA_DIR / "users.json"
 DOCUMENTS_DIR = DATA_DIR / "documents"
 SESSION_DB_PATH = DATA_DIR / "sessions.json"
 VECTOR_DB_PATH = DATA_DIR / "vectordb"
+QUERY_LOG_PATH = DATA_DIR / "query_log.jsonl"
+ROLE_DB_PATH = DATA_DIR / "roles.json"
 
 DATA_DIR.mkdir(exist_ok=True)
 DOCUMENTS_DIR.mkdir(exist_ok=True)
 VECTOR_DB_PATH.mkdir(exist_ok=True)
 
-ROLES = ["finance", "engineering", "admin"]
+DEFAULT_ROLES = ["finance", "engineering", "admin"]
+MAX_OPEN_COLLECTIONS = 32
+CHROMA_MEMORY_LIMIT_BYTES = 512 * 1024 * 1024
+EMBEDDING_MODEL = "text-embedding-ada-002"
 SESSION_EXPIRY = 60 * 60
 RATE_LIMIT_WINDOW = 60
 RATE_LIMIT_MAX_REQUESTS = 10
 
+DEFAULT_ROUTE = "standard"
+# max_context_chars of None sends every retrieved document whole, as before routing existed
+QUERY_ROUTES = {
+    "lookup": {"top_k": 1, "max_context_chars": None, "model": "gpt-3.5-turbo", "max_tokens": 200},
+    "standard": {"top_k": 3, "max_context_chars": None, "model": "gpt-3.5-turbo", "max_tokens": 800},
+    "analysis": {"top_k": 5, "max_context_chars": 24000, "model": "gpt-3.5-turbo", "max_tokens": 800},
+}
+ROUTE_STATS_WINDOW = 500
+
+INGEST_READ_BLOCK = 1024 * 1024
+INGEST_CHUNK_CHARS = 2000
+INGEST_CHUNK_OVERLAP = 200
+INGEST_BATCH_SIZE = 64
+DOCUMENT_LIST_PAGE_SIZE = 1000
+
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_PAGE_SIZE = 1000
+SNAPSHOT_LOAD_BATCH_SIZE = 5000
+
+QUERY_LOG_QUEUE_SIZE = 10000
+QUERY_LOG_BATCH_SIZE = 200
+QUERY_LOG_FLUSH_INTERVAL = 1.0
+QUERY_LOG_MAX_BYTES = 50 * 1024 * 1024
+QUERY_LOG_BACKUP_COUNT = 5
+# A query counts as a hit only if some retrieved document scores at least this similarity
+QUERY_HIT_MIN_SCORE = 0.5
+
 def get_openai_api_key():
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
@@ -0,0 +1,40 @@
+import argparse
+from pathlib import Path
+from config import QUERY_HIT_MIN_SCORE, QUERY_LOG_PATH
+from queryLog import iter_events, summarize_events
+
+def main():
+    parser = argparse.ArgumentParser(description="Report on the structured query log")
+    parser.add_argument("--log", type=Path, default=QUERY_LOG_PATH, help="Path of the query log")
+    parser.add_argument("--top", type=int, default=10, help="Number of entries per section")
+    parser.add_argument("--min-score", type=float, default=QUERY_HIT_MIN_SCORE,
+                        help="Minimum similarity for a retrieved document to count as a hit")
+    args = parser.parse_args()
+    
+    summary = summarize_events(iter_events(args.log), top_n=args.top, min_score=args.min_score)
+    print(f"Total queries: {summary['total']}")
+    
+    print("\nTop queries:")
+    for query, count in summary["top_queries"]:
+        print(f"  {count:6d}  {query}")
+    
+    print("\nCache-worthy duplicates (role, query):")
+    for role, query, count in summary["cache_candidates"]:
+        print(f"  {count:6d}  [{role}] {query}")
+    
+    print(f"\nZero-hit queries by role (no document scored {args.min_score} or higher):")
+    for role, queries in summary["zero_hit_queries"].items():
+        print(f"  {role}:")
+        for query, count in queries:
+            print(f"    {count:6d}  {query}")
+    
+    print("\nFailed queries by role:")
+    for role, count in summary["errors"].items():
+        print(f"  {role}: {count}")
+    
+    print("\nMean latency by route:")
+    for route, latency in summary["mean_latency"].items():
+        print(f"  {route}: {latency:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import atexit
+from collections import Counter, defaultdict
+import json
+import os
+from pathlib import Path
+import queue
+import threading
+import time
+from typing import Dict, Iterator, List
+from config import (QUERY_HIT_MIN_SCORE, QUERY_LOG_BACKUP_COUNT, QUERY_LOG_BATCH_SIZE,
+                    QUERY_LOG_FLUSH_INTERVAL, QUERY_LOG_MAX_BYTES, QUERY_LOG_PATH, QUERY_LOG_QUEUE_SIZE)
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class QueryLogger:
+    def __init__(self, log_path: Path = QUERY_LOG_PATH, queue_size: int = QUERY_LOG_QUEUE_SIZE,
+                 batch_size: int = QUERY_LOG_BATCH_SIZE, flush_interval: float = QUERY_LOG_FLUSH_INTERVAL,
+                 max_bytes: int = QUERY_LOG_MAX_BYTES, backup_count: int = QUERY_LOG_BACKUP_COUNT):
+        self.log_path = Path(log_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def log_event(self, event: Dict) -> bool:
+        event = {"timestamp": time.time(), **event}
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            # Never block the request path; drop the event instead
+            with self._dropped_lock:
+                self.dropped += 1
+            return False
+
+    def close(self, timeout: float = 5.0) -> None:
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._writer.join(timeout)
+        if self.dropped:
+            logger.warning(f"Query log dropped {self.dropped} events because the queue was full")
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    logger.error(f"Error writing query log: {str(e)}")
+
+    def _next_batch(self) -> List[Dict]:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, batch: List[Dict]) -> None:
+        if self.log_path.exists() and self.log_path.stat().st_size >= self.max_bytes:
+            self._rotate()
+        with open(self.log_path, 'a') as f:
+            f.write("".join(json.dumps(event) + "\n" for event in batch))
+
+    def _rotate(self) -> None:
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self.log_path.with_name(f"{self.log_path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.log_path.with_name(f"{self.log_path.name}.{i + 1}"))
+        if self.backup_count > 0:
+            os.replace(self.log_path, self.log_path.with_name(f"{self.log_path.name}.1"))
+        else:
+            self.log_path.unlink()
+
+
+def iter_events(log_path: Path = QUERY_LOG_PATH) -> Iterator[Dict]:
+    log_path = Path(log_path)
+    rotated = sorted(
+        log_path.parent.glob(f"{log_path.name}.*"),
+        key=lambda p: int(p.suffix[1:]) if p.suffix[1:].isdigit() else 0,
+        reverse=True
+    )
+    for path in rotated + [log_path]:
+        if not path.exists():
+            continue
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed query log line in {path}")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def is_hit(event: Dict, min_score: float = QUERY_HIT_MIN_SCORE) -> bool:
+    # Chroma always returns top_k rows from a non-empty collection, so judge hits by relevance
+    return any(score >= min_score for score in event.get("scores", []))
+
+
+def summarize_events(events: Iterator[Dict], top_n: int = 10, min_score: float = QUERY_HIT_MIN_SCORE) -> Dict:
+    total = 0
+    query_counts = Counter()
+    role_query_counts = Counter()
+    zero_hits = defaultdict(Counter)
+    errors = Counter()
+    latencies = defaultdict(list)
+
+    for event in events:
+        total += 1
+        role = event.get("role", "unknown")
+        query = normalize_query(event.get("query", ""))
+        query_counts[query] += 1
+        role_query_counts[(role, query)] += 1
+        if event.get("error"):
+            errors[role] += 1
+        elif not is_hit(event, min_score):
+            zero_hits[role][query] += 1
+        if "latency" in event:
+            latencies[event.get("route", "unknown")].append(event["latency"])
+
+    return {
+        "total": total,
+        "top_queries": query_counts.most_common(top_n),
+        # Answers are scoped to a role, so only same-role repeats can share a cache entry
+        "cache_candidates": [
+            (role, query, count)
+            for (role, query), count in role_query_counts.most_common()
+            if count > 1
+        ][:top_n],
+        "zero_hit_queries": {
+            role: counts.most_common(top_n) for role, counts in zero_hits.items()
+        },
+        "errors": dict(errors),
+        "mean_latency": {
+            route: sum(values) / len(values) for route, values in latencies.items()
+        }
+    }
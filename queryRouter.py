@@ -0,0 +1,83 @@
+import re
+import threading
+from collections import defaultdict, deque
+from typing import Dict, List, Optional, Tuple
+from config import DEFAULT_ROUTE, QUERY_ROUTES, ROUTE_STATS_WINDOW
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ANALYSIS_CUES = (
+    "analyze", "analyse", "analysis", "compare", "comparison", "explain", "why",
+    "summarize", "summarise", "summary", "trend", "impact", "evaluate", "implications",
+    "pros and cons", "difference between", "recommend", "break down", "walk me through",
+)
+LOOKUP_CUES = (
+    "what is", "what's", "who is", "when is", "when are", "when was", "where is",
+    "how much", "how many", "which", "list", "define",
+)
+WORD_RE = re.compile(r"\w+")
+# Cues match whole words only, so "listen" is not "list" and "whyte" is not "why"
+ANALYSIS_RE = re.compile(r"\b(?:" + "|".join(map(re.escape, ANALYSIS_CUES)) + r")\b")
+LOOKUP_RE = re.compile(r"^(?:" + "|".join(map(re.escape, LOOKUP_CUES)) + r")\b")
+
+
+class QueryRouter:
+    def __init__(self, routes: Dict[str, Dict] = None, default_route: str = DEFAULT_ROUTE,
+                 stats_window: int = ROUTE_STATS_WINDOW):
+        self.routes = routes if routes is not None else QUERY_ROUTES
+        if default_route not in self.routes:
+            raise ValueError(f"Default route '{default_route}' is not in the routing table")
+        self.default_route = default_route
+
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(lambda: deque(maxlen=stats_window))
+        self._counts = defaultdict(int)
+
+    def classify(self, query: str) -> str:
+        text = query.lower().strip()
+        words = WORD_RE.findall(text)
+
+        if "analysis" in self.routes:
+            if ANALYSIS_RE.search(text) or len(words) > 30 or text.count("?") > 1:
+                return "analysis"
+        if "lookup" in self.routes:
+            # Short "how"/"why" questions usually need a full procedural answer
+            short_lookup = len(words) <= 4 and words[:1] not in (["how"], ["why"])
+            if short_lookup or (len(words) <= 12 and LOOKUP_RE.match(text)):
+                return "lookup"
+        return self.default_route
+
+    def route(self, query: str) -> Tuple[str, Dict]:
+        name = self.classify(query)
+        return name, self.routes[name]
+
+    def record_latency(self, route: str, seconds: float) -> None:
+        with self._lock:
+            self._counts[route] += 1
+            self._latencies[route].append(seconds)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            snapshot = {route: (self._counts[route], sorted(samples)) for route, samples in self._latencies.items()}
+
+        stats = {}
+        for route, (count, samples) in snapshot.items():
+            if not samples:
+                continue
+            stats[route] = {
+                "count": count,
+                "mean": sum(samples) / len(samples),
+                "p50": self._percentile(samples, 0.50),
+                "p95": self._percentile(samples, 0.95),
+                "max": samples[-1]
+            }
+        return stats
+
+    @staticmethod
+    def _percentile(sorted_samples: List[float], fraction: float) -> Optional[float]:
+        if not sorted_samples:
+            return None
+        index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+        return sorted_samples[index]
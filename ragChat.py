@@ -1,3 +1,7 @@
+import time
+from typing import Dict, List, Optional, Tuple
+from queryLog import QueryLogger
+from queryRouter import QueryRouter
 from vectorDocumentStore import VectorDocumentStore
 import logging
 
@@ -5,21 +9,46 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 class RAGChat:
-    def __init__(self, client, doc_store: VectorDocumentStore):
+    def __init__(self, client, doc_store: VectorDocumentStore, router: QueryRouter = None,
+                 query_logger: QueryLogger = None):
         self.client = client
         self.doc_store = doc_store
+        self.router = router if router is not None else QueryRouter()
+        self.query_logger = query_logger
         
     def chat(self, role: str, query: str, history=None) -> str:
         if history is None:
             history = []
         
-        docs = self.doc_store.search_documents(role, query, top_k=3)
+        route_name, route = self.router.route(query)
+        docs = []
+        error = False
+        start_time = time.perf_counter()
+        try:
+            docs = self.doc_store.search_documents(role, query, top_k=route["top_k"])
+            answer, error = self._answer(role, query, route, docs)
+            return answer
+        except Exception:
+            error = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start_time
+            self.router.record_latency(route_name, elapsed)
+            if self.query_logger is not None:
+                self.query_logger.log_event({
+                    "role": role,
+                    "query": query,
+                    "route": route_name,
+                    "titles": [doc["title"] for doc in docs],
+                    "scores": [doc["score"] for doc in docs],
+                    "latency": elapsed,
+                    "error": error
+                })
+
+    def _answer(self, role: str, query: str, route: Dict, docs: List[Dict]) -> Tuple[str, bool]:
         if not docs:
-            return "I couldn't find any relevant documents to help answer your question."
-        context = "\n\n".join([
-            f"Document: {doc['title']}\n{doc['content']}"
-            for doc in docs
-        ])
+            return "I couldn't find any relevant documents to help answer your question.", False
+        context = self._build_context(docs, route.get("max_context_chars"))
         messages = [
             {"role": "system", "content": f"""You are a helpful assistant with access to {role} documents. 
              Answer the user's question based on the retrieved documents. 
@@ -29,13 +58,29 @@ class RAGChat:
         ]
         try:
             response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+                model=route["model"],
                 messages=messages,
                 temperature=0.2,
-                max_tokens=800
+                max_tokens=route["max_tokens"]
             )
-            return response.choices[0].message.content
+            return response.choices[0].message.content, False
             
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
-            return f"I encountered an error while generating a response: {str(e)}"
+            return f"I encountered an error while generating a response: {str(e)}", True
+
+    def _build_context(self, docs: List[Dict], max_chars: Optional[int] = None) -> str:
+        parts = [f"Document: {doc['title']}\n{doc['content']}" for doc in docs]
+        if max_chars is None:
+            return "\n\n".join(parts)
+        
+        kept = []
+        remaining = max_chars
+        for part in parts:
+            if len(part) > remaining:
+                if kept:
+                    break
+                part = part[:remaining]
+            kept.append(part)
+            remaining -= len(part)
+        return "\n\n".join(kept)
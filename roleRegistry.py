@@ -0,0 +1,78 @@
+import json
+import re
+import threading
+from pathlib import Path
+from typing import List
+from config import DEFAULT_ROLES, ROLE_DB_PATH
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Role names become Chroma collection names ("<role>_docs") and document directories
+ROLE_NAME_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,49}$")
+PROTECTED_ROLES = {"admin"}
+
+class RoleRegistry:
+    def __init__(self, role_db_path: Path = ROLE_DB_PATH):
+        self.role_db_path = role_db_path
+        self._lock = threading.Lock()
+        self.roles = self._load_roles()
+        self._role_set = set(self.roles)
+
+    def _load_roles(self) -> List[str]:
+        if self.role_db_path.exists():
+            with open(self.role_db_path, 'r') as f:
+                return json.load(f)
+        else:
+            roles = list(DEFAULT_ROLES)
+            self._save_roles(roles)
+            return roles
+
+    def _save_roles(self, roles: List[str] = None) -> None:
+        if roles is None:
+            roles = self.roles
+        with open(self.role_db_path, 'w') as f:
+            json.dump(roles, f, indent=2)
+
+    def __contains__(self, role: str) -> bool:
+        return role in self._role_set
+
+    def list_roles(self) -> List[str]:
+        return list(self.roles)
+
+    @staticmethod
+    def normalize(role: str) -> str:
+        return role.strip().lower()
+
+    def add_role(self, role: str) -> bool:
+        role = self.normalize(role)
+        if not ROLE_NAME_RE.match(role):
+            logger.warning(f"Invalid role name: {role}")
+            return False
+
+        with self._lock:
+            if role in self._role_set:
+                logger.warning(f"Role {role} already exists")
+                return False
+            self.roles.append(role)
+            self._role_set.add(role)
+            self._save_roles()
+        logger.info(f"Added role {role}")
+        return True
+
+    def remove_role(self, role: str) -> bool:
+        role = self.normalize(role)
+        if role in PROTECTED_ROLES:
+            logger.warning(f"Role {role} cannot be removed")
+            return False
+
+        with self._lock:
+            if role not in self._role_set:
+                logger.warning(f"Role {role} does not exist")
+                return False
+            self.roles.remove(role)
+            self._role_set.discard(role)
+            self._save_roles()
+        logger.info(f"Removed role {role}")
+        return True
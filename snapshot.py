@@ -0,0 +1,26 @@
+import argparse
+from pathlib import Path
+from vectorDocumentStore import VectorDocumentStore
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export or import a vector store snapshot. Run only while the app is stopped; "
+                    "use the admin panel to export from a running app."
+    )
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("bundle", type=Path, help="Path of the snapshot bundle")
+    args = parser.parse_args()
+    
+    doc_store = VectorDocumentStore(None, offline=True)
+    if args.action == "export":
+        manifest = doc_store.export_snapshot(args.bundle)
+        for role, info in manifest["roles"].items():
+            print(f"{role}: {info['count']} vectors")
+        print(f"Snapshot written to {args.bundle}")
+    else:
+        if not doc_store.import_snapshot(args.bundle):
+            raise SystemExit(f"Failed to import snapshot {args.bundle}")
+        print(f"Snapshot {args.bundle} imported")
+
+if __name__ == "__main__":
+    main()
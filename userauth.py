@@ -1,20 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor
+import csv
 from datetime import datetime, timedelta
 import hashlib
 import json
+import os
 from pathlib import Path
 import secrets
 import time
-from typing import Dict, Optional, Tuple
-from config import ROLES, SESSION_EXPIRY , USER_DB_PATH, SESSION_DB_PATH
+from typing import Dict, List, Optional, Tuple
+from config import SESSION_EXPIRY , USER_DB_PATH, SESSION_DB_PATH
+from roleRegistry import RoleRegistry
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class UserAuth:
-    def __init__(self, user_db_path: Path = USER_DB_PATH, session_db_path: Path = SESSION_DB_PATH):
+    def __init__(self, user_db_path: Path = USER_DB_PATH, session_db_path: Path = SESSION_DB_PATH,
+                 role_registry: RoleRegistry = None):
         self.user_db_path = user_db_path
         self.session_db_path = session_db_path
+        self.roles = role_registry if role_registry is not None else RoleRegistry()
         self.users = self._load_users()
         self.sessions = self._load_sessions()
         self._cleanup_expired_sessions()
@@ -177,21 +183,77 @@ class UserAuth:
             logger.warning(f"User {username} already exists")
             return False
         
-        if role not in ROLES:
-            logger.warning(f"Invalid role: {role}. Must be one of {ROLES}")
+        if role not in self.roles:
+            logger.warning(f"Invalid role: {role}. Role is not registered")
             return False
         
+        self.users[username] = self._new_user_record(password, role)
+        self._save_users()
+        logger.info(f"Added user {username} with role {role}")
+        return True
+    
+    def add_users(self, new_users: List[Dict], max_workers: int = None) -> List[Dict]:
+        report = []
+        accepted = []
+        seen = set()
+        for entry in new_users:
+            username = (entry.get("username") or "").strip()
+            password = entry.get("password") or ""
+            role = (entry.get("role") or "").strip()
+            
+            error = None
+            if not username:
+                error = "Missing username"
+            elif not password:
+                error = "Missing password"
+            elif role not in self.roles:
+                error = f"Invalid role: {role}. Role is not registered"
+            elif username in self.users or username in seen:
+                error = "User already exists"
+            
+            if error:
+                report.append({"username": username, "role": role, "success": False, "error": error})
+                continue
+            seen.add(username)
+            accepted.append((username, password, role))
+            report.append({"username": username, "role": role, "success": True, "error": None})
+        
+        if accepted:
+            # pbkdf2_hmac releases the GIL, so threads hash on all cores
+            workers = max_workers or os.cpu_count() or 1
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                records = list(executor.map(
+                    lambda user: self._new_user_record(user[1], user[2]), accepted
+                ))
+            for (username, _, _), record in zip(accepted, records):
+                self.users[username] = record
+            self._save_users()
+        
+        logger.info(f"Bulk import added {len(accepted)} of {len(new_users)} users")
+        return report
+    
+    def add_users_from_csv(self, csv_path: Path, max_workers: int = None) -> List[Dict]:
+        # utf-8-sig strips the BOM that Excel writes at the start of CSV exports
+        with open(csv_path, 'r', newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            missing = {"username", "password", "role"} - set(reader.fieldnames or [])
+            if missing:
+                raise ValueError(f"CSV is missing required columns: {sorted(missing)}")
+            rows = list(reader)
+        return self.add_users(rows, max_workers=max_workers)
+    
+    def _new_user_record(self, password: str, role: str) -> Dict:
         salt = self._generate_salt()
-        self.users[username] = {
+        return {
             "password_hash": self._hash_password(password, salt),
             "role": role,
             "salt": salt,
             "failed_attempts": 0,
             "last_attempt": None
         }
-        self._save_users()
-        logger.info(f"Added user {username} with role {role}")
-        return True
+    
+    def users_with_role(self, role: str) -> List[str]:
+        return [username for username, user_data in self.users.items() if user_data["role"] == role]
     
     def list_users(self) -> Dict:
         return {username: user_data["role"] for username, user_data in self.users.items()}
\ No newline at end of file